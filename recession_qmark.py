@@ -1,15 +1,21 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
+import numpy as np
 import datetime
+import os
+import tempfile
+import threading
+import time
 import requests
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-
-# Page config
-st.set_page_config(page_title="Yield Curve Monitor", page_icon="📊", layout="wide")
-
-# Custom CSS
-st.markdown("""
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import diskcache
+from concurrent.futures import ThreadPoolExecutor
+
+# Static page content
+CUSTOM_CSS = """
     <style>
     .big-metric {
         font-size: 3rem;
@@ -42,16 +48,9 @@ st.markdown("""
         margin: 20px 0;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
 
-# Title with emoji
-st.title("📊 U.S. Yield Curve Monitor")
-st.markdown("### Real-time recession indicator based on Treasury yield spreads")
-
-# Sidebar with info
-with st.sidebar:
-    st.header("ℹ️ About")
-    st.markdown("""
+ABOUT_TEXT = """
     **What is Yield Curve Inversion?**
     
     When the 2-year Treasury yield exceeds the 10-year yield, 
@@ -65,201 +64,364 @@ with st.sidebar:
     - 🟢 Normal: Spread > 0%
     - 🟡 Flattening: 0% to -0.2%
     - 🔴 Inverted: < -0.2%
-    """)
+    """
+
+# Page config
+st.set_page_config(page_title="Yield Curve Monitor", page_icon="📊", layout="wide")
+
+# Custom CSS
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+# Title with emoji
+st.title("📊 U.S. Yield Curve Monitor")
+st.markdown("### Real-time recession indicator based on Treasury yield spreads")
+
+# Sidebar with info
+with st.sidebar:
+    st.header("ℹ️ About")
+    st.markdown(ABOUT_TEXT)
     
     st.markdown("---")
     st.markdown("**Data Source:** Federal Reserve Economic Data (FRED)")
 
-def fetch_fred_data(series_id, start_date, end_date):
-    """Fetch data from FRED API"""
-    url = "https://api.stlouisfed.org/fred/series/observations"
-    
-    # Your FRED API key
-    api_key = "d0d2c8e46964b4dd9fafc65fe9141aa8"
-    
-    params = {
-        'series_id': series_id,
-        'api_key': api_key,
-        'file_type': 'json',
-        'observation_start': start_date,
-        'observation_end': end_date
-    }
-    
+# FRED request limits: (connect, read) timeout in seconds, and the circuit
+# breaker that skips the network after repeated failures
+FRED_TIMEOUT = (3, 5)
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 5*60
+
+# How long fetched series are reused, in memory and on disk, before
+# asking FRED again
+FETCH_TTL = 60*60
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session so FRED connections are kept alive"""
+    session = requests.Session()
+    # Retry transient FRED failures with backoff instead of failing the run;
+    # timeouts are not retried so an outage cannot stall the script
+    retry = Retry(total=3, connect=1, read=0, backoff_factor=0.3,
+                  status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=['GET'])
+    session.mount('https://', HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=4))
+    return session
+
+@st.cache_resource
+def get_breaker():
+    """Shared FRED failure count and time of the last failure"""
+    return {'failures': 0, 'last_failure': 0.0, 'lock': threading.Lock()}
+
+def breaker_open():
+    """Whether FRED requests are paused after repeated outages"""
+    breaker = get_breaker()
+    with breaker['lock']:
+        return (breaker['failures'] >= BREAKER_THRESHOLD
+                and time.time() - breaker['last_failure'] < BREAKER_COOLDOWN)
+
+def record_fetch_result(error):
+    """Update the circuit breaker after one fetch of both series"""
+    # Only outages count; client errors such as a bad API key do not
+    outage = isinstance(error, (requests.ConnectionError, requests.Timeout,
+                                requests.exceptions.RetryError))
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        outage = status == 429 or status >= 500
+
+    breaker = get_breaker()
+    with breaker['lock']:
+        if error is None:
+            breaker['failures'] = 0
+        elif outage:
+            breaker['failures'] += 1
+            breaker['last_failure'] = time.time()
+
+def fred_get(url, params):
+    """GET from FRED, raising on failure"""
+    response = get_session().get(url, params=params, timeout=FRED_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+def get_api_key():
+    """FRED API key from the environment or Streamlit secrets, or None"""
+    api_key = os.environ.get("FRED_API_KEY")
+    # Only touch st.secrets when a secrets file exists; reading it otherwise
+    # draws a "No secrets found" error on the page
+    if not api_key and st.secrets.load_if_toml_exists():
+        api_key = st.secrets.get("fred_api_key")
+    return api_key or None
+
+def parse_value(value):
+    """Convert a FRED observation value, where '.' marks a missing day"""
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+@st.cache_resource
+def get_disk_cache():
+    """On-disk FRED cache shared across restarts and worker processes"""
+    return diskcache.Cache(os.path.join(tempfile.gettempdir(), 'fred_cache'),
+                           size_limit=64 << 20)
+
+@st.cache_data(ttl=FETCH_TTL, show_spinner=False)
+def fetch_fred_data(series_id, start_date, end_date, api_key):
+    """Fetch data from FRED API, backed by the on-disk cache.
+
+    Failures raise rather than return None, so Streamlit never caches them.
+    """
+    cache = get_disk_cache()
+    key = (series_id, start_date, end_date)
+    df = cache.get(key)
+    if df is None:
+        df = download_fred_data(series_id, start_date, end_date, api_key)
+        # Disk entries share the memory TTL so they only help cold starts
+        # and never hold back the hourly refresh
+        cache.set(key, df, expire=FETCH_TTL)
+    return df
+
+def download_fred_data(series_id, start_date, end_date, api_key):
+    """Download and parse one series from the FRED API, raising on failure"""
+    if api_key is None:
+        dates, raw_values = download_fred_csv(series_id, start_date, end_date)
+    else:
+        url = "https://api.stlouisfed.org/fred/series/observations"
         
-        if 'observations' in data:
-            df = pd.DataFrame(data['observations'])
-            df['date'] = pd.to_datetime(df['date'])
-            df['value'] = pd.to_numeric(df['value'], errors='coerce')
-            df = df[['date', 'value']].set_index('date')
-            return df
-        else:
-            return None
+        params = {
+            'series_id': series_id,
+            'api_key': api_key,
+            'file_type': 'json',
+            'observation_start': start_date,
+            'observation_end': end_date
+        }
+        
+        response = fred_get(url, params)
+        data = orjson.loads(response.content)
+        
+        if 'observations' not in data:
+            raise ValueError(f"FRED response for {series_id} has no observations")
+
+        obs = data['observations']
+        dates = [o['date'] for o in obs]
+        raw_values = [o['value'] for o in obs]
+
+    values = np.fromiter((parse_value(v) for v in raw_values),
+                         dtype=np.float32, count=len(raw_values))
+    df = pd.DataFrame({'value': values},
+                      index=pd.to_datetime(dates, format='%Y-%m-%d', cache=True))
+    df.index.name = 'date'
+    return df
+
+def download_fred_csv(series_id, start_date, end_date):
+    """Download one series from FRED's keyless public CSV export"""
+    url = "https://fred.stlouisfed.org/graph/fredgraph.csv"
+    params = {'id': series_id, 'cosd': start_date, 'coed': end_date}
+
+    response = fred_get(url, params)
+
+    # Skip the header row; each line is "date,value"
+    rows = [line.split(',') for line in response.text.splitlines()[1:] if line]
+    return [r[0] for r in rows], [r[1] for r in rows]
+
+def fetch_yields(start_date, end_date, api_key):
+    """Fetch the 10-year and 2-year series concurrently over the shared session.
+
+    Not cached itself: the workers carry this run's script context, so the
+    st.cache_data/st.cache_resource calls they make in fetch_fred_data hit
+    the shared caches. A failure in either series raises here, and counts
+    once towards the circuit breaker.
+    """
+    if breaker_open():
+        raise RuntimeError("FRED requests paused after repeated failures")
+
+    ctx = get_script_run_ctx()
+    try:
+        with ThreadPoolExecutor(max_workers=2, initializer=add_script_run_ctx,
+                                initargs=(None, ctx)) as executor:
+            f10 = executor.submit(fetch_fred_data, 'DGS10', start_date, end_date, api_key)
+            f2 = executor.submit(fetch_fred_data, 'DGS2', start_date, end_date, api_key)
+            result = f10.result(), f2.result()
     except Exception as e:
-        return None
-
-# Define date range
-end = datetime.date.today()
-start = end - datetime.timedelta(days=365)  # Get 1 year of data
-
-start_str = start.strftime('%Y-%m-%d')
-end_str = end.strftime('%Y-%m-%d')
-
-# Fetch data
-with st.spinner("📡 Fetching latest Treasury yield data..."):
-    dgs10 = fetch_fred_data('DGS10', start_str, end_str)
-    dgs2 = fetch_fred_data('DGS2', start_str, end_str)
-
-if dgs10 is None or dgs2 is None:
-    st.error("❌ Unable to fetch data from FRED. Please check your API key and try again.")
-    st.stop()
-
-# Combine data
-df = pd.concat([dgs10.rename(columns={'value': 'DGS10'}), 
-               dgs2.rename(columns={'value': 'DGS2'})], axis=1)
-df = df.dropna()
-
-if df.empty:
-    st.error("No data available. Please try again later.")
-    st.stop()
-
-# Calculate spread
-df['Spread'] = df['DGS10'] - df['DGS2']
-
-# Latest values
-ten_year = df['DGS10'].iloc[-1]
-two_year = df['DGS2'].iloc[-1]
-latest_date = df.index[-1]
-spread = ten_year - two_year
-
-# Determine status
-if spread < -0.2:
-    status = "🔴 Inverted"
-    status_class = "inverted"
-    message = "Strong recession signal. Historical precedent suggests elevated recession risk."
-elif spread < 0:
-    status = "🟡 Flattening"
-    status_class = "normal"
-    message = "Yield curve is flattening. Monitor for further inversion."
-else:
-    status = "🟢 Normal"
-    status_class = "normal"
-    message = "Healthy yield curve. No immediate recession signal."
-
-# Display metrics
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.metric(
-        label="10-Year Treasury Yield",
-        value=f"{ten_year:.2f}%",
-        delta=f"{df['DGS10'].iloc[-1] - df['DGS10'].iloc[-5]:.2f}% (5-day)"
-    )
-
-with col2:
-    st.metric(
-        label="2-Year Treasury Yield",
-        value=f"{two_year:.2f}%",
-        delta=f"{df['DGS2'].iloc[-1] - df['DGS2'].iloc[-5]:.2f}% (5-day)"
-    )
-
-with col3:
-    st.metric(
-        label="10-2 Year Spread",
-        value=f"{spread:.2f}%",
-        delta=f"{df['Spread'].iloc[-1] - df['Spread'].iloc[-5]:.2f}% (5-day)"
-    )
-
-# Big status display
-st.markdown(f"""
-    <div class="big-metric {status_class}">
-        {status}
-    </div>
-""", unsafe_allow_html=True)
-
-st.markdown(f"**As of:** {latest_date.strftime('%B %d, %Y')}")
-st.markdown(f"**Analysis:** {message}")
-
-# Create interactive chart
-fig = make_subplots(
-    rows=2, cols=1,
-    subplot_titles=('Treasury Yields (Past Year)', 'Yield Spread (10Y - 2Y)'),
-    vertical_spacing=0.12,
-    row_heights=[0.5, 0.5]
-)
-
-# Yields chart
-fig.add_trace(
-    go.Scatter(x=df.index, y=df['DGS10'], name='10-Year',
-               line=dict(color='#667eea', width=2)),
-    row=1, col=1
-)
-fig.add_trace(
-    go.Scatter(x=df.index, y=df['DGS2'], name='2-Year',
-               line=dict(color='#f5576c', width=2)),
-    row=1, col=1
-)
-
-# Spread chart with colored zones
-fig.add_trace(
-    go.Scatter(x=df.index, y=df['Spread'], name='Spread',
-               line=dict(color='#764ba2', width=3),
-               fill='tozeroy',
-               fillcolor='rgba(118, 75, 162, 0.2)'),
-    row=2, col=1
-)
-
-# Add zero line
-fig.add_hline(y=0, line_dash="dash", line_color="gray", row=2, col=1)
-
-# Update layout
-fig.update_xaxes(title_text="Date", row=2, col=1)
-fig.update_yaxes(title_text="Yield (%)", row=1, col=1)
-fig.update_yaxes(title_text="Spread (%)", row=2, col=1)
-
-fig.update_layout(
-    height=700,
-    showlegend=True,
-    hovermode='x unified',
-    plot_bgcolor='rgba(0,0,0,0)',
-    paper_bgcolor='rgba(0,0,0,0)'
-)
-
-st.plotly_chart(fig, use_container_width=True)
-
-# Statistics
-st.markdown("---")
-st.subheader("📈 Historical Statistics (Past Year)")
-
-col1, col2 = st.columns(2)
-
-with col1:
-    st.markdown("**10-Year Treasury**")
-    st.write(f"Current: {ten_year:.2f}%")
-    st.write(f"Average: {df['DGS10'].mean():.2f}%")
-    st.write(f"Range: {df['DGS10'].min():.2f}% - {df['DGS10'].max():.2f}%")
-
-with col2:
-    st.markdown("**2-Year Treasury**")
-    st.write(f"Current: {two_year:.2f}%")
-    st.write(f"Average: {df['DGS2'].mean():.2f}%")
-    st.write(f"Range: {df['DGS2'].min():.2f}% - {df['DGS2'].max():.2f}%")
-
-# Inversion days count
-inversion_days = len(df[df['Spread'] < 0])
-total_days = len(df)
-inversion_pct = (inversion_days / total_days) * 100
-
-st.markdown(f"""
-    <div class="info-box">
-        <strong>Inversion History:</strong> The yield curve has been inverted for 
-        <strong>{inversion_days}</strong> out of <strong>{total_days}</strong> trading days 
-        in the past year (<strong>{inversion_pct:.1f}%</strong> of the time).
-    </div>
-""", unsafe_allow_html=True)
+        record_fetch_result(e)
+        raise
+    record_fetch_result(None)
+    return result
+
+# Yields chart styling, filled with data by build_figure
+YIELDS_FIGURE_TEMPLATE = {
+    'traces': [
+        {'name': '10-Year', 'line': dict(color='#667eea', width=2)},
+        {'name': '2-Year', 'line': dict(color='#f5576c', width=2)},
+    ],
+    'layout': dict(
+        title='Treasury Yields (Past Year)',
+        xaxis=dict(title=dict(text="Date")),
+        yaxis=dict(title=dict(text="Yield (%)")),
+        height=400,
+        showlegend=True,
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    ),
+}
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def build_figure(df):
+    """Build the yields chart; the cached Figure is shared and never mutated"""
+    # Imported lazily so the metrics render before Plotly is loaded
+    import plotly.graph_objects as go
+
+    # Build traces and layout in one constructor call so they are validated once
+    columns = ('DGS10', 'DGS2')
+    traces = [go.Scatter(x=df.index, y=df[col].to_numpy(), **style)
+              for col, style in zip(columns, YIELDS_FIGURE_TEMPLATE['traces'])]
+    return go.Figure(data=traces, layout=YIELDS_FIGURE_TEMPLATE['layout'])
+
+def render_dashboard(df):
+    """Render metrics, chart and statistics for the combined yields"""
+    # Calculate spread
+    yields = df[['DGS10', 'DGS2']].to_numpy()
+    spread_np = (yields[:, 0] - yields[:, 1]).round(2)
+
+    # Latest values
+    (ten_year_5d, two_year_5d), (ten_year, two_year) = yields[[-5, -1]]
+    spread_5d, spread = spread_np[[-5, -1]]
+    latest_date = df.index[-1]
+
+    # Determine status
+    if spread < -0.2:
+        status = "🔴 Inverted"
+        status_class = "inverted"
+        message = "Strong recession signal. Historical precedent suggests elevated recession risk."
+    elif spread < 0:
+        status = "🟡 Flattening"
+        status_class = "normal"
+        message = "Yield curve is flattening. Monitor for further inversion."
+    else:
+        status = "🟢 Normal"
+        status_class = "normal"
+        message = "Healthy yield curve. No immediate recession signal."
+
+    # Display metrics
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric(
+            label="10-Year Treasury Yield",
+            value=f"{ten_year:.2f}%",
+            delta=f"{ten_year - ten_year_5d:.2f}% (5-day)"
+        )
+
+    with col2:
+        st.metric(
+            label="2-Year Treasury Yield",
+            value=f"{two_year:.2f}%",
+            delta=f"{two_year - two_year_5d:.2f}% (5-day)"
+        )
+
+    with col3:
+        st.metric(
+            label="10-2 Year Spread",
+            value=f"{spread:.2f}%",
+            delta=f"{spread - spread_5d:.2f}% (5-day)"
+        )
+
+    # Big status display
+    st.markdown(f"""
+        <div class="big-metric {status_class}">
+            {status}
+        </div>
+    """, unsafe_allow_html=True)
+
+    st.markdown(f"**As of:** {latest_date.strftime('%B %d, %Y')}")
+    st.markdown(f"**Analysis:** {message}")
+
+    # Interactive chart
+    st.plotly_chart(build_figure(df), use_container_width=True)
+
+    # Spread chart on Streamlit's native fast path
+    st.markdown("**Yield Spread (10Y - 2Y)**")
+    st.area_chart(pd.Series(spread_np, index=df.index, name='Spread'), color='#764ba2',
+                  x_label="Date", y_label="Spread (%)")
+
+    # Statistics
+    st.markdown("---")
+    st.subheader("📈 Historical Statistics (Past Year)")
+
+    stats = df[['DGS10', 'DGS2']].agg(['mean', 'min', 'max'])
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("**10-Year Treasury**")
+        st.write(f"Current: {ten_year:.2f}%")
+        st.write(f"Average: {stats.at['mean', 'DGS10']:.2f}%")
+        st.write(f"Range: {stats.at['min', 'DGS10']:.2f}% - {stats.at['max', 'DGS10']:.2f}%")
+
+    with col2:
+        st.markdown("**2-Year Treasury**")
+        st.write(f"Current: {two_year:.2f}%")
+        st.write(f"Average: {stats.at['mean', 'DGS2']:.2f}%")
+        st.write(f"Range: {stats.at['min', 'DGS2']:.2f}% - {stats.at['max', 'DGS2']:.2f}%")
+
+    # Inversion days count
+    inversion_days = int(np.count_nonzero(spread_np < 0))
+    total_days = spread_np.size
+    inversion_pct = (inversion_days / total_days) * 100
+
+    st.markdown(f"""
+        <div class="info-box">
+            <strong>Inversion History:</strong> The yield curve has been inverted for 
+            <strong>{inversion_days}</strong> out of <strong>{total_days}</strong> trading days 
+            in the past year (<strong>{inversion_pct:.1f}%</strong> of the time).
+        </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment(run_every="5min")
+def live_panel():
+    """Fetch the latest yields and render the dashboard, refreshing on a timer"""
+    # Define date range
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365)  # Get 1 year of data
+
+    start_str = start.strftime('%Y-%m-%d')
+    end_str = end.strftime('%Y-%m-%d')
+    api_key = get_api_key()
+
+    # Fetch data
+    try:
+        with st.spinner("📡 Fetching latest Treasury yield data..."):
+            dgs10, dgs2 = fetch_yields(start_str, end_str, api_key)
+    except Exception:
+        # Keep showing the last good data if FRED fails mid-session
+        if 'last_good_df' in st.session_state:
+            st.warning("⚠️ Unable to reach FRED. Showing the most recently fetched data.")
+            render_dashboard(st.session_state['last_good_df'])
+        elif breaker_open():
+            st.error("❌ FRED is not responding. Requests are paused for a few minutes before retrying.")
+        else:
+            st.error("❌ Unable to fetch data from FRED. Please check your API key and try again.")
+        return
+
+    # Combine data
+    idx = dgs10.index.intersection(dgs2.index)
+    # Widen the float32 values and round to FRED's 2 decimals for display
+    df = pd.DataFrame({'DGS10': dgs10.loc[idx, 'value'].to_numpy(np.float64).round(2),
+                       'DGS2': dgs2.loc[idx, 'value'].to_numpy(np.float64).round(2)},
+                      index=idx)
+    df = df.dropna()
+
+    if df.empty:
+        st.error("No data available. Please try again later.")
+        return
+
+    st.session_state['last_good_df'] = df
+    render_dashboard(df)
+
+if get_api_key() is None:
+    st.info("ℹ️ No FRED API key configured. Set `fred_api_key` in Streamlit secrets "
+            "or the `FRED_API_KEY` environment variable; using FRED's public CSV "
+            "download until then.")
+
+live_panel()
 
 # Footer
 st.markdown("---")